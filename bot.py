@@ -1,112 +1,384 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
-from collections.abc import Callable, Coroutine, Iterator
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
 from configparser import ConfigParser
-from typing import Optional, Union, cast
+from typing import Any, Optional, TypeVar, Union, cast
 
 
 import disnake
+import googleapiclient.errors  # type: ignore
+import httplib2  # type: ignore
 import pydrive2.auth  # type: ignore
-import pydrive2.drive  # type: ignore
 from disnake.ext import commands
 from disnake.interactions import ApplicationCommandInteraction as Interaction
 
+try:
+    import uvloop  # type: ignore
+except ImportError:  # optional, and not available on windows
+    uvloop = None
+
 Channel = Union[disnake.TextChannel, disnake.Thread, disnake.VoiceChannel]
+T = TypeVar("T")
 
 
-class PuzzleDrive(pydrive2.drive.GoogleDrive):
+class PuzzleDrive:
     saved_credentials_file = "drive_credentials.json"
+    saved_folders_file = "drive_folders.json"
+    query_cache_seconds = 30
+    token_check_seconds = 60
+    http_cache_directory = ".drive_http_cache"
+    spreadsheet_query = (
+        "mimeType = 'application/vnd.google-apps.spreadsheet' and trashed = false"
+    )
 
-    def __init__(self, root_folder: str) -> None:
+    def __init__(
+        self,
+        root_folder: str,
+        root_folder_id: Optional[str] = None,
+        solved_folder_id: Optional[str] = None,
+    ) -> None:
         self.authentication = self.get_authentication()
+        self.http_connections = threading.local()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self.refresh_lock = asyncio.Lock()
+        self.next_token_check = 0.0
+        self.recent_queries: dict[tuple[str, str], tuple[float, list]] = {}
         if self.authentication.credentials is None:
             self.authenticate_in_command_line()
-        super().__init__(self.authentication)
         print("Loaded Google Drive credentials")
-        self.root_folder_id = self.get_root_folder_id(root_folder)
-        self.solved_folder_id = self.get_solved_folder_id()
+        # blank ids in config.ini count as unset
+        if root_folder_id and solved_folder_id:
+            self.root_folder_id = root_folder_id
+            self.solved_folder_id = solved_folder_id
+        elif (
+            not root_folder_id
+            and not solved_folder_id
+            and (saved_folder_ids := self.load_folder_ids(root_folder)) is not None
+            and self.folders_exist(saved_folder_ids)
+        ):
+            self.root_folder_id, self.solved_folder_id = saved_folder_ids
+        else:
+            # config.ini may set just one of the ids, then only the other is looked up
+            folders = self.list_folders(root_folder)
+            self.root_folder_id = root_folder_id or self.get_root_folder_id(
+                root_folder, folders
+            )
+            self.solved_folder_id = solved_folder_id or self.get_solved_folder_id(
+                folders
+            )
+            self.save_folder_ids(root_folder)
+        self.in_root_folder = f"'{self.root_folder_id}' in parents"
+        self.in_any_folder = (
+            f"({self.in_root_folder} or '{self.solved_folder_id}' in parents)"
+        )
+        self.spreadsheet_links = self.list_spreadsheet_links()
+
+    @classmethod
+    def load_folder_ids(cls, root_folder_title: str) -> Optional[tuple[str, str]]:
+        try:
+            with open(cls.saved_folders_file) as file:
+                saved = json.load(file)
+            if saved["root folder"] != root_folder_title:
+                return None
+            return saved["root folder id"], saved["solved folder id"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
 
-    def get_root_folder_id(self, root_folder_title: str) -> str:
+    def folders_exist(self, folder_ids: tuple[str, ...]) -> bool:
+        # saved ids go stale if a folder is trashed or deleted, which would otherwise
+        # only show up as an error in the middle of a command; all of them are checked
+        # in one batch so this costs no more than searching for the folders
         self.refresh_token_if_expired()
-        # could be hardcoded to speed up startup
+        files = self.get_service().files()
+        usable = []
+
+        def check_folder(_request_id, response, exception) -> None:
+            usable.append(exception is None and not response["labels"]["trashed"])
+
         try:
-            return self.ListFile(
+            self.execute_batch(
+                [
+                    files.get(fileId=folder_id, fields="labels(trashed)")
+                    for folder_id in folder_ids
+                ],
+                check_folder,
+            )
+        except googleapiclient.errors.HttpError:
+            return False
+        return all(usable)
+
+    def save_folder_ids(self, root_folder_title: str) -> None:
+        with open(self.saved_folders_file, "w") as file:
+            json.dump(
                 {
-                    "q": f"mimeType = 'application/vnd.google-apps.folder' and title = "
-                    f"'{root_folder_title}'"
-                }
-            ).GetList()[0]["id"]
-        except IndexError:
+                    "root folder": root_folder_title,
+                    "root folder id": self.root_folder_id,
+                    "solved folder id": self.solved_folder_id,
+                },
+                file,
+            )
+
+    def list_folders(self, root_folder_title: str) -> list:
+        self.refresh_token_if_expired()
+        # the solved folder lookup depends on the root folder id, so instead of two
+        # dependent searches fetch both candidates at once and match up the parents
+        return self.list_files(
+            f"mimeType = 'application/vnd.google-apps.folder' and trashed = false and "
+            f"(title = '{escape_query(root_folder_title)}' or title = 'Solved')",
+            "id,title,parents(id)",
+        )
+
+    def get_root_folder_id(self, root_folder_title: str, folders: list) -> str:
+        try:
+            return next(
+                folder["id"]
+                for folder in folders
+                if folder["title"] == root_folder_title
+            )
+        except StopIteration:
             print(
                 f"Could not find {root_folder_title} in Google Drive. "
                 f"Make sure to correctly set the folder name in config.ini"
             )
             exit(1)
 
-    def get_solved_folder_id(self) -> str:
+    def get_solved_folder_id(self, folders: list) -> str:
         try:
-            return self.ListFile(
-                {
-                    "q": f"mimeType = 'application/vnd.google-apps.folder' and "
-                    f"title = 'Solved' and '{self.root_folder_id}' in parents"
-                }
-            ).GetList()[0]["id"]
-        except IndexError:
+            return next(
+                folder["id"]
+                for folder in folders
+                if folder["title"] == "Solved"
+                and any(
+                    parent["id"] == self.root_folder_id
+                    for parent in folder.get("parents", [])
+                )
+            )
+        except StopIteration:
             return self.create_file("Solved", "application/vnd.google-apps.folder")[
                 "id"
             ]
 
-    def add_spreadsheet(self, title: str) -> str:
+    def list_spreadsheet_links(self) -> dict[str, str]:
+        # a single listing at startup, so that adding a puzzle does not have to
+        # search Drive for an existing spreadsheet
         self.refresh_token_if_expired()
-        if search_list := self.ListFile(
-            {
-                "q": f"mimeType = 'application/vnd.google-apps.spreadsheet' and "
-                f"title = '{title}' and '{self.root_folder_id}' in parents and "
-                f"trashed = false"
-            }
-        ).GetList():
-            return search_list[0]["alternateLink"]
-        return self.create_file(title, "application/vnd.google-apps.spreadsheet")[
-            "alternateLink"
+        spreadsheets = self.list_files(
+            f"{self.spreadsheet_query} and {self.in_any_folder}",
+            "id,title,alternateLink,parents(id),properties(key,value)",
+            page_size=1000,
+        )
+        # spreadsheets made by hand or before the bot tagged them are matched by title
+        # once, so that later searches by property find them too
+        untagged = [
+            spreadsheet
+            for spreadsheet in spreadsheets
+            if get_puzzle_value(spreadsheet) is None
         ]
 
-    def create_file(self, title, mime_type):
-        file = self.CreateFile(
-            {
+        def record_tag(request_id, _response, exception) -> None:
+            # tagging is best effort, eg spreadsheets shared read-only cannot be, and
+            # those are left out of the index
+            spreadsheet = untagged[int(request_id)]
+            if exception is None:
+                tag = puzzle_title_property(spreadsheet["title"])
+                spreadsheet["properties"] = [tag]
+            else:
+                print(f"Could not tag spreadsheet {spreadsheet['title']}: {exception}")
+
+        properties = self.get_service().properties()
+        try:
+            self.execute_batch(
+                [
+                    properties.insert(
+                        fileId=spreadsheet["id"],
+                        body=puzzle_title_property(spreadsheet["title"]),
+                    )
+                    for spreadsheet in untagged
+                ],
+                record_tag,
+            )
+        except googleapiclient.errors.HttpError as exception:
+            print(f"Could not tag spreadsheets: {exception}")
+        return {
+            value: spreadsheet["alternateLink"]
+            for spreadsheet in spreadsheets
+            if (value := get_puzzle_value(spreadsheet)) is not None
+            and any(
+                parent["id"] == self.root_folder_id
+                for parent in spreadsheet.get("parents", [])
+            )
+        }
+
+    async def add_spreadsheet(self, title: str) -> str:
+        key = puzzle_title_property(title)["value"]
+        if (link := self.spreadsheet_links.get(key)) is not None:
+            return link
+        await self.refresh_token()
+        spreadsheet = await self.run_blocking(
+            self.create_file,
+            title,
+            "application/vnd.google-apps.spreadsheet",
+            [puzzle_title_property(title)],
+        )
+        self.spreadsheet_links[key] = spreadsheet["alternateLink"]
+        self.remember_query(title, self.in_root_folder, [spreadsheet])
+        self.recent_queries.pop((title, self.in_any_folder), None)
+        return spreadsheet["alternateLink"]
+
+    def create_file(self, title, mime_type, properties=()) -> dict[str, str]:
+        # a single files.insert request whose response already carries the id and
+        # alternateLink, so no metadata fetch is needed
+        request = self.get_service().files().insert(
+            body={
                 "title": title,
                 "parents": [{"id": self.root_folder_id}],
                 "mimeType": mime_type,
-            }
+                "properties": list(properties),
+            },
+            fields="id,alternateLink",
+        )
+        return request.execute(http=self.get_http_object())
+
+    async def remove_spreadsheet(self, title: str) -> None:
+        await self.refresh_token()
+        spreadsheets = await self.list_spreadsheets(title, self.in_any_folder)
+        files = self.get_service().files()
+        await self.run_blocking(
+            self.execute_batch,
+            [files.trash(fileId=spreadsheet["id"]) for spreadsheet in spreadsheets],
         )
-        file.Upload()
-        file.FetchMetadata()
-        return file
+        self.remember_query(title, self.in_root_folder, [])
+        self.remember_query(title, self.in_any_folder, [])
+        self.spreadsheet_links.pop(puzzle_title_property(title)["value"], None)
+
+    async def move_spreadsheet_to_solved(self, title: str) -> None:
+        await self.refresh_token()
+        spreadsheets = await self.list_spreadsheets(title, self.in_root_folder)
+        files = self.get_service().files()
+        await self.run_blocking(
+            self.execute_batch,
+            [
+                files.patch(
+                    fileId=spreadsheet["id"],
+                    addParents=self.solved_folder_id,
+                    removeParents=self.root_folder_id,
+                    body={},
+                )
+                for spreadsheet in spreadsheets
+            ],
+        )
+        self.remember_query(title, self.in_root_folder, [])
+        self.recent_queries.pop((title, self.in_any_folder), None)
+        self.spreadsheet_links.pop(puzzle_title_property(title)["value"], None)
 
-    def remove_spreadsheet(self, title: str) -> None:
-        self.refresh_token_if_expired()
-        for folder in [self.root_folder_id, self.solved_folder_id]:
-            for spreadsheet in self.ListFile(
-                {
-                    "q": f"mimeType = 'application/vnd.google-apps.spreadsheet' and "
-                    f"title = '{title}' and '{folder}' in parents and trashed = false"
-                }
-            ).GetList():
-                spreadsheet.Trash()
+    def execute_batch(
+        self, requests: list, callback: Optional[Callable[..., None]] = None
+    ) -> None:
+        # Drive accepts up to 100 requests in a single multipart batch round-trip; the
+        # callback gets each request's index in the list as its request id
+        if callback is None:
+            callback = raise_batch_error
+        http = self.get_http_object()
+        if len(requests) == 1:
+            try:
+                response = requests[0].execute(http=http)
+            except googleapiclient.errors.HttpError as exception:
+                callback("0", None, exception)
+            else:
+                callback("0", response, None)
+            return
+        for start in range(0, len(requests), 100):
+            batch = self.get_service().new_batch_http_request(callback=callback)
+            for index in range(start, min(start + 100, len(requests))):
+                batch.add(requests[index], request_id=str(index))
+            batch.execute(http=http)
+
+    def list_files(
+        self, query: str, fields: str, page_size: int = 100
+    ) -> list[dict[str, Any]]:
+        files = self.get_service().files()
+        http = self.get_http_object()
+        items = []
+        page_token = None
+        while True:
+            response = files.list(
+                q=query,
+                fields=f"nextPageToken,items({fields})",
+                maxResults=page_size,
+                pageToken=page_token,
+            ).execute(http=http)
+            items.extend(response.get("items", []))
+            if (page_token := response.get("nextPageToken")) is None:
+                return items
+
+    def get_service(self):
+        # GoogleAuth only builds its Drive service once it is authorized
+        if self.authentication.service is None:
+            self.authentication.Authorize()
+        return self.authentication.service
+
+    async def list_spreadsheets(self, title: str, in_folders: str) -> list:
+        # results are reused for a short while so that retries and repeated
+        # commands for the same puzzle do not search Drive again; the cache is only
+        # touched from the event loop, never from the pool's threads
+        cached = self.recent_queries.get((title, in_folders))
+        if cached is not None:
+            queried_at, spreadsheets = cached
+            if time.monotonic() - queried_at < self.query_cache_seconds:
+                return spreadsheets
+        spreadsheets = await self.run_blocking(
+            self.search_spreadsheets, title, in_folders
+        )
+        self.remember_query(title, in_folders, spreadsheets)
+        return spreadsheets
+
+    def search_spreadsheets(self, title: str, in_folders: str) -> list:
+        # searching by the property the bot tags its spreadsheets with is an exact
+        # match, unlike title search, and a single query covers several folders
+        puzzle_property = puzzle_title_property(title)
+        return self.list_files(
+            f"{self.spreadsheet_query} and {in_folders} and properties has {{ "
+            f"key = '{puzzle_property['key']}' and "
+            f"value = '{escape_query(puzzle_property['value'])}' and "
+            f"visibility = 'PRIVATE' }}",
+            "id",
+        )
 
-    def move_spreadsheet_to_solved(self, title: str) -> None:
-        self.refresh_token_if_expired()
-        for spreadsheet in self.ListFile(
-            {
-                "q": f"mimeType = 'application/vnd.google-apps.spreadsheet' and "
-                f"title = '{title}' and '{self.root_folder_id}' in parents and "
-                f"trashed = false"
-            }
-        ).GetList():
-            spreadsheet["parents"] = [
-                {"kind": "drive#fileLink", "id": self.solved_folder_id}
-            ]
-            spreadsheet.Upload()
+    def remember_query(self, title: str, in_folders: str, spreadsheets: list) -> None:
+        now = time.monotonic()
+        # drop expired searches, so the cache does not keep every title ever seen
+        self.recent_queries = {
+            key: (queried_at, cached)
+            for key, (queried_at, cached) in self.recent_queries.items()
+            if now - queried_at < self.query_cache_seconds
+        }
+        self.recent_queries[title, in_folders] = (now, spreadsheets)
+
+    def run_blocking(self, function: Callable[..., T], *args: Any) -> Awaitable[T]:
+        # the Drive service blocks on HTTP, so keep it off the event loop that
+        # discord's gateway and every other command run on
+        return asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    async def refresh_token(self) -> None:
+        # the authorized connections also refresh the token on a 401 response, so
+        # the expiry only needs to be looked at once in a while
+        now = time.monotonic()
+        if now < self.next_token_check:
+            return
+        self.next_token_check = now + self.token_check_seconds
+        if not self.authentication.access_token_expired:
+            return
+        # concurrent commands would otherwise all refresh the same token
+        async with self.refresh_lock:
+            await self.run_blocking(self.refresh_token_if_expired)
 
     def refresh_token_if_expired(self) -> None:
         if not self.authentication.access_token_expired:
@@ -117,8 +389,21 @@ class PuzzleDrive(pydrive2.drive.GoogleDrive):
         except pydrive2.auth.RefreshError:
             self.authenticate_in_command_line()
 
+    def get_http_object(self) -> httplib2.Http:
+        # GoogleAuth builds a new httplib2.Http (and so a new TLS connection) every
+        # time it is asked for one; reuse one authorized connection per thread instead
+        http = getattr(self.http_connections, "http", None)
+        if http is None:
+            http = self.authentication.Get_Http_Object()
+            # lets httplib2 revalidate repeated GET requests by ETag instead of
+            # downloading the whole response again
+            http.cache = httplib2.FileCache(self.http_cache_directory)
+            self.http_connections.http = http
+        return http
+
     def authenticate_in_command_line(self) -> None:
         self.authentication.CommandLineAuth()
+        self.http_connections = threading.local()
         self.authentication.SaveCredentialsFile(self.saved_credentials_file)
         print(f"Google authentication saved to {self.saved_credentials_file}")
 
@@ -134,25 +419,49 @@ class PuzzleDrive(pydrive2.drive.GoogleDrive):
         return authentication
 
 
-THUMBS_UP = "👍"
-THUMBS_DOWN = "👎"
+def escape_query(value: str) -> str:
+    # Drive query strings are single-quoted, with backslash escapes
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def puzzle_title_property(title: str) -> dict[str, str]:
+    # Drive limits a property's key and value to 124 bytes together, so titles that
+    # do not fit are stored as a hash, which still tells every title apart
+    value = title
+    if len(title.encode()) > 124 - len("puzzle"):
+        value = hashlib.sha256(title.encode()).hexdigest()
+    return {"key": "puzzle", "value": value, "visibility": "PRIVATE"}
+
+
+def get_puzzle_value(spreadsheet: dict[str, Any]) -> Optional[str]:
+    return next(
+        (
+            puzzle_property["value"]
+            for puzzle_property in spreadsheet.get("properties", [])
+            if puzzle_property["key"] == "puzzle"
+        ),
+        None,
+    )
 
 
-async def find_or_make_category(
-    guild: disnake.Guild, name: str
-) -> disnake.CategoryChannel:
-    category = disnake.utils.get(guild.categories, name=name)
-    return await guild.create_category(name) if category is None else category
+def raise_batch_error(_request_id, _response, exception: Optional[Exception]) -> None:
+    if exception is not None:
+        raise exception
+
+
+THUMBS_UP = "👍"
+THUMBS_DOWN = "👎"
+TITLE_DELETIONS = str.maketrans("", "", "'\"#")
 
 
 def title_converter(_, title: str) -> str:
-    return title.replace("'", "").replace('"', "").replace("#", "").strip()
+    return title.translate(TITLE_DELETIONS).strip()
 
 
 def category_has_prefix(
-    category: Optional[disnake.CategoryChannel], prefix: str
+    category: Optional[disnake.CategoryChannel], lowercase_prefix: str
 ) -> bool:
-    return category is not None and category.name.lower().startswith(prefix.lower())
+    return category is not None and category.name.lower().startswith(lowercase_prefix)
 
 
 def normalize_round_name(name):
@@ -184,8 +493,54 @@ def get_admin_mention_or_empty(guild: disnake.Guild) -> str:
 class PuzzleBot:
     description = "A bot to help puzzle hunts"
     solved_category_name = "✅Solved"
+    solved_category_prefix = solved_category_name.lower()
     general_category_name = "💭General"  # should probably be a configuration option
     default_puzzle_category = "🧩Puzzles"
+    event_names = (
+        "on_ready",
+        "on_voice_state_update",
+        "on_guild_channel_create",
+        "on_guild_channel_delete",
+        "on_guild_channel_update",
+    )
+    slash_commands: tuple[tuple[str, dict[str, Any]], ...] = (
+        ("add_puzzle", {"name": "puzzle", "description": "Add a puzzle"}),
+        (
+            "voice",
+            {"description": "Toggle voice channel, use in the puzzle's text channel"},
+        ),
+        ("solve", {"description": "Solve puzzle, use in the puzzle's text channel"}),
+        (
+            "remove_puzzle",
+            {
+                "name": "remove",
+                "description": "Remove a puzzle",
+                "default_member_permissions": disnake.Permissions(administrator=True),
+            },
+        ),
+        (
+            "manual_voice_cleanup",
+            {
+                "name": "voice_cleanup",
+                "description": "remove voice channels not in use",
+            },
+        ),
+        # (
+        #     "channel_cleanup",
+        #     {
+        #         "name": "cleanup",
+        #         "description": "ONLY USE IF YOU KNOW WHAT YOU ARE DOING: removes all puzzle channels",
+        #         "default_member_permissions": disnake.Permissions(administrator=True),
+        #     },
+        # ),
+    )
+    round_slash_commands: tuple[tuple[str, dict[str, Any]], ...] = (
+        (
+            "add_in_round",
+            {"name": "puzzle-in-round", "description": "Add a puzzle to a round"},
+        ),
+        ("round", {"name": "round", "description": "Add a round"}),
+    )
 
     def __init__(
         self,
@@ -193,9 +548,13 @@ class PuzzleBot:
         guild_id: int,
         drive_root_folder: str,
         rounds: bool = False,
+        drive_root_folder_id: Optional[str] = None,
+        drive_solved_folder_id: Optional[str] = None,
         **_,
     ) -> None:
-        self.drive = PuzzleDrive(drive_root_folder)
+        self.drive = PuzzleDrive(
+            drive_root_folder, drive_root_folder_id, drive_solved_folder_id
+        )
 
         self.token = token
         self.guild_id = guild_id
@@ -203,62 +562,48 @@ class PuzzleBot:
         self.known_rounds = {}
         self.current_round = None if self.use_rounds else self.default_puzzle_category
         self.voices_to_oppress = set()
+        self.category_channel_counts: Counter[int] = Counter()
+        self.solved_category_id: Optional[int] = None
+        self.text_channels_by_topic: dict[str, disnake.TextChannel] = {}
+        self.voice_channels_by_name: dict[str, disnake.VoiceChannel] = {}
+        self.categories_by_name: dict[str, disnake.CategoryChannel] = {}
+        self.solved_category_ids: set[int] = set()
+        self.channel_requests = asyncio.Semaphore(5)
         self.client = commands.InteractionBot(test_guilds=[guild_id])
 
-        for event in self.events:
-            self.client.event(event)
+        self.register_events()
         self.register_commands()
 
     def start(self) -> None:
         self.client.run(self.token)
 
-    @property
-    def events(self) -> Iterator[Callable[..., Coroutine]]:
-        yield self.on_ready
-        yield self.on_voice_state_update
+    def register_events(self) -> None:
+        for event_name in self.event_names:
+            self.client.event(getattr(self, event_name))
 
     def register_commands(self) -> None:
-        self.client.slash_command(name="puzzle", description="Add a puzzle")(
-            self.add_puzzle
+        slash_commands = (
+            self.slash_commands + self.round_slash_commands
+            if self.use_rounds
+            else self.slash_commands
         )
-        if self.use_rounds:
-            self.client.slash_command(
-                name="puzzle-in-round", description="Add a puzzle to a round"
-            )(self.add_in_round)
-            self.client.slash_command(name="round", description="Add a round")(
-                self.round
-            )
-        self.client.slash_command(
-            description="Toggle voice channel, use in the puzzle's text channel"
-        )(self.voice)
-        self.client.slash_command(
-            description="Solve puzzle, use in the puzzle's text channel"
-        )(self.solve)
-        self.client.slash_command(
-            name="remove",
-            description="Remove a puzzle",
-            default_member_permissions=disnake.Permissions(administrator=True),
-        )(self.remove_puzzle)
-        self.client.slash_command(
-            name="voice_cleanup", description="remove voice channels not in use"
-        )(self.manual_voice_cleanup)
-        # self.client.slash_command(
-        #     name="cleanup",
-        #     description="ONLY USE IF YOU KNOW WHAT YOU ARE DOING: removes all puzzle channels",
-        #     default_member_permissions=disnake.Permissions(administrator=True),
-        # )(self.channel_cleanup)
+        for method_name, options in slash_commands:
+            self.client.slash_command(**options)(getattr(self, method_name))
 
     async def voice_cleanup(self, guild: Optional[disnake.Guild] = None) -> int:
         if guild is None:
             guild = self.client.get_guild(self.guild_id)
         if guild is None:
             return 0
-        count = 0
-        for channel in guild.voice_channels:
-            name = channel.name.strip().lower()
-            if not any(name.startswith(prefix) for prefix in ["lobby", "general"]):
-                count += await self.remove_voice_channel(channel, None)
-        return count
+        # deletions go through rate_limited, so they can all be started at once
+        removed = await asyncio.gather(
+            *(
+                self.remove_voice_channel(channel, None)
+                for channel in guild.voice_channels
+                if not channel.name.strip().lower().startswith(("lobby", "general"))
+            )
+        )
+        return sum(removed)
 
     async def before_voice_cleanup(self):
         await self.client.wait_until_ready()
@@ -275,7 +620,7 @@ class PuzzleBot:
     #     guild = self.client.get_guild(self.guild_id)
     #     if guild is None:
     #         return
-    #     category = await find_or_make_category(guild, "archive 2023")
+    #     category = await self.find_or_make_category(guild, "archive 2023")
     #     channels = [
     #         channel
     #         for channel in guild.text_channels
@@ -297,6 +642,7 @@ class PuzzleBot:
     async def on_ready(self) -> None:
         guild = self.client.get_guild(self.guild_id)
         if guild is not None:
+            self.index_channels(guild)
             await self.create_categories(guild)
             self.known_rounds = self.parse_rounds(guild)
             self.voices_to_oppress = await self.find_voices_to_oppress(guild)
@@ -350,7 +696,7 @@ class PuzzleBot:
         if guild is None:
             raise ValueError("Cannot access guild")
         await interaction.send(f"Creating round {round_name}")
-        await guild.create_category(name=round_name)
+        await self.rate_limited(guild.create_category(name=round_name))
         self.known_rounds[normalize_round_name(round_name)] = round_name
         if self.use_rounds:
             await self.set_round(round_name)
@@ -361,7 +707,7 @@ class PuzzleBot:
         # TODO should not need this cast since checking if TextChannel
         puzzle_title = self.get_puzzle_title(text_channel, unsolved=True)
         if not isinstance(text_channel, disnake.TextChannel) or puzzle_title is None:
-            if category_has_prefix(text_channel.category, self.solved_category_name):
+            if self.is_solved_category(text_channel.category):
                 await interaction.send("Puzzle already solved 🧠", ephemeral=True)
             else:
                 await interaction.send(
@@ -372,15 +718,20 @@ class PuzzleBot:
         if guild is None:
             raise ValueError("Cannot access guild")
         await interaction.send(f"Marking {puzzle_title} as ✅solved")
-        solved_category = await find_or_make_category(guild, self.solved_category_name)
-        if len(solved_category.channels) == 50:
+        solved_category_id = await self.get_solved_category_id(guild)
+        if self.category_channel_counts[solved_category_id] >= 50:
             await interaction.send(
                 f"{get_admin_mention_or_empty(guild)} The solved category is full! 🈵"
             )
             return await add_reaction(interaction, THUMBS_DOWN)
-        await text_channel.edit(category=solved_category)
-        self.drive.move_spreadsheet_to_solved(puzzle_title)
-        if not await self.find_and_remove_voice_channel(interaction, puzzle_title):
+        voice_removed, *_ = await asyncio.gather(
+            self.find_and_remove_voice_channel(interaction, puzzle_title),
+            self.rate_limited(
+                text_channel.edit(category=disnake.Object(id=solved_category_id))
+            ),
+            self.drive.move_spreadsheet_to_solved(puzzle_title),
+        )
+        if not voice_removed:
             self.voices_to_oppress.add(puzzle_title)
         await add_reaction(interaction, THUMBS_UP)
         return puzzle_title
@@ -393,10 +744,10 @@ class PuzzleBot:
             raise ValueError("Cannot access guild")
         await interaction.send(f'Removing "{puzzle_title}"')
         await self.find_and_remove_voice_channel(interaction, puzzle_title)
-        text_channel = disnake.utils.get(guild.text_channels, topic=puzzle_title)
+        text_channel = self.text_channels_by_topic.get(puzzle_title)
         if text_channel is not None:
-            await text_channel.delete()
-        self.drive.remove_spreadsheet(puzzle_title)
+            await self.rate_limited(text_channel.delete())
+        await self.drive.remove_spreadsheet(puzzle_title)
         await add_reaction(interaction, THUMBS_UP)
 
     async def voice(self, interaction: Interaction) -> None:
@@ -415,7 +766,7 @@ class PuzzleBot:
         await interaction.send(
             f"Toggling 🔊voice channel for {puzzle_title}", ephemeral=True
         )
-        voice_channel = disnake.utils.get(guild.voice_channels, name=puzzle_title)
+        voice_channel = self.voice_channels_by_name.get(puzzle_title)
         if voice_channel is not None:
             reaction = (
                 THUMBS_UP
@@ -423,8 +774,10 @@ class PuzzleBot:
                 else THUMBS_DOWN
             )
         else:
-            await guild.create_voice_channel(
-                name=puzzle_title, category=text_channel.category
+            await self.rate_limited(
+                guild.create_voice_channel(
+                    name=puzzle_title, category=text_channel.category
+                )
             )
             reaction = THUMBS_UP
         await add_reaction(interaction, reaction)
@@ -446,14 +799,95 @@ class PuzzleBot:
         if channel is None or after.channel == channel:
             return
         if not channel.members and (name := channel.name) in self.voices_to_oppress:
-            await channel.delete()
+            await self.rate_limited(channel.delete())
             self.voices_to_oppress.remove(name)
 
+    async def on_guild_channel_create(self, channel: disnake.abc.GuildChannel) -> None:
+        if channel.guild.id == self.guild_id:
+            self.track_channel(channel, 1)
+
+    async def on_guild_channel_delete(self, channel: disnake.abc.GuildChannel) -> None:
+        if channel.guild.id == self.guild_id:
+            self.track_channel(channel, -1)
+        if channel.id == self.solved_category_id:
+            self.solved_category_id = None
+
+    async def on_guild_channel_update(
+        self, before: disnake.abc.GuildChannel, after: disnake.abc.GuildChannel
+    ) -> None:
+        if after.guild.id == self.guild_id:
+            self.track_channel(before, -1)
+            self.track_channel(after, 1)
+
+    def index_channels(self, guild: disnake.Guild) -> None:
+        self.category_channel_counts = Counter()
+        self.text_channels_by_topic = {}
+        self.voice_channels_by_name = {}
+        self.categories_by_name = {}
+        self.solved_category_ids = set()
+        for channel in guild.channels:
+            self.track_channel(channel, 1)
+
+    def track_channel(self, channel: disnake.abc.GuildChannel, change: int) -> None:
+        # keeps the channel counts per category and the lookup tables up to date
+        # from channel events, so commands never have to rescan the guild
+        if channel.category_id is not None:
+            self.category_channel_counts[channel.category_id] += change
+        if isinstance(channel, disnake.CategoryChannel):
+            if change < 0:
+                self.solved_category_ids.discard(channel.id)
+            elif category_has_prefix(channel, self.solved_category_prefix):
+                self.solved_category_ids.add(channel.id)
+        index, key = self.get_channel_index(channel)
+        if key is None:
+            return
+        if change > 0:
+            index[key] = channel
+        elif (indexed := index.get(key)) is not None and indexed.id == channel.id:
+            current = channel.guild.get_channel(channel.id)
+            if current is not None and self.get_channel_index(current)[1] == key:
+                # only updated and still has the key, so it is indexed again after this
+                return
+            # another channel may still have the same key, eg an archived copy of a
+            # puzzle, so look for one before forgetting the key
+            for other in channel.guild.channels:
+                other_index, other_key = self.get_channel_index(other)
+                if other_index is index and other_key == key and other.id != channel.id:
+                    index[key] = other
+                    return
+            del index[key]
+
+    def get_channel_index(
+        self, channel: disnake.abc.GuildChannel
+    ) -> tuple[dict[str, Any], Optional[str]]:
+        if isinstance(channel, disnake.TextChannel):
+            return self.text_channels_by_topic, channel.topic
+        if isinstance(channel, disnake.VoiceChannel):
+            return self.voice_channels_by_name, channel.name
+        if isinstance(channel, disnake.CategoryChannel):
+            return self.categories_by_name, channel.name
+        return {}, None
+
+    async def rate_limited(self, request: Awaitable[T]) -> T:
+        # Discord only allows a few channel changes at a time, so concurrent commands
+        # queue here instead of bouncing off rate limits and retrying
+        async with self.channel_requests:
+            return await request
+
+    async def find_or_make_category(
+        self, guild: disnake.Guild, name: str
+    ) -> disnake.CategoryChannel:
+        category = self.categories_by_name.get(name)
+        if category is None:
+            category = await self.rate_limited(guild.create_category(name))
+            self.categories_by_name[name] = category
+        return category
+
     async def find_voices_to_oppress(self, guild: disnake.Guild) -> set[str]:
         return {
             puzzle_title
             for category in guild.categories
-            if category.name.startswith(self.solved_category_name)
+            if self.is_solved_category(category)
             for channel in category.text_channels
             if (puzzle_title := self.get_puzzle_title(channel)) is not None
             if not await self.find_and_remove_voice_channel(guild, puzzle_title)
@@ -465,9 +899,18 @@ class PuzzleBot:
             if self.use_rounds
             else [self.solved_category_name, self.default_puzzle_category]
         )
-        for category in to_create:
-            if disnake.utils.get(guild.categories, name=category) is None:
-                await guild.create_category(category)
+        solved_category, *_ = await asyncio.gather(
+            *(self.find_or_make_category(guild, name) for name in to_create)
+        )
+        self.solved_category_id = solved_category.id
+
+    async def get_solved_category_id(self, guild: disnake.Guild) -> int:
+        if self.solved_category_id is None:
+            category = await self.find_or_make_category(
+                guild, self.solved_category_name
+            )
+            self.solved_category_id = category.id
+        return self.solved_category_id
 
     def get_puzzle_title(
         self, channel: Channel, unsolved: bool = False
@@ -475,14 +918,17 @@ class PuzzleBot:
         if not isinstance(channel, disnake.TextChannel) or channel.topic is None:
             return None
         category = channel.category
-        if unsolved and category_has_prefix(category, self.solved_category_name):
+        if unsolved and self.is_solved_category(category):
             return None
         return channel.topic.strip()
 
+    def is_solved_category(self, category: Optional[disnake.CategoryChannel]) -> bool:
+        return category is not None and category.id in self.solved_category_ids
+
     def parse_rounds(self, guild: disnake.Guild) -> dict[str, str]:
         rounds = {}
         for category in guild.categories:
-            if category_has_prefix(category, self.solved_category_name):
+            if self.is_solved_category(category):
                 continue
             if category_has_prefix(category, "archive"):
                 continue
@@ -514,7 +960,7 @@ class PuzzleBot:
         round_name: str,
         guild: disnake.Guild,
     ) -> None:
-        category = disnake.utils.get(guild.categories, name=round_name)
+        category = self.categories_by_name.get(round_name)
         if category is None:
             await interaction.send(
                 f"Something went wrong; maybe the category {round_name} was deleted or created manually?"
@@ -528,34 +974,62 @@ class PuzzleBot:
             )
         else:
             await interaction.send(f"Creating puzzle {puzzle_title}")
-        existing_channel = disnake.utils.get(guild.text_channels, topic=puzzle_title)
+        existing_channel = self.text_channels_by_topic.get(puzzle_title)
         if existing_channel is not None:
             await interaction.send(
                 f"There's already a puzzle called {puzzle_title} at {existing_channel.mention}"
             )
             await add_reaction(interaction, THUMBS_DOWN)
-        link = self.drive.add_spreadsheet(puzzle_title)
-        channel = await self.add_puzzle_text_channel(
-            guild, puzzle_title, category=category
+            return
+        link, *channels = await asyncio.gather(
+            self.drive.add_spreadsheet(puzzle_title),
+            self.rate_limited(
+                self.add_puzzle_text_channel(guild, puzzle_title, category=category)
+            ),
+            self.rate_limited(
+                guild.create_voice_channel(name=puzzle_title, category=category)
+            ),
+            return_exceptions=True,
         )
+        if errors := [
+            result for result in (link, *channels) if isinstance(result, BaseException)
+        ]:
+            # remove whatever was created, so that retrying /puzzle starts afresh
+            # instead of finding a channel without a spreadsheet
+            await asyncio.gather(
+                *(
+                    self.rate_limited(created.delete())
+                    for created in channels
+                    if not isinstance(created, BaseException)
+                ),
+                return_exceptions=True,
+            )
+            raise errors[0]
+        channel = cast(disnake.TextChannel, channels[0])
         link_message = await channel.send(
             f"I found a 📔spreadsheet for this puzzle at {link}"
         )
-        await link_message.pin()
-        await guild.create_voice_channel(name=puzzle_title, category=category)
+        await asyncio.gather(
+            link_message.pin(),
+            interaction.edit_original_message(
+                content=f'Created 🧩 "{puzzle_title}" at {channel.mention}'
+            ),
+        )
         if self.use_rounds:
             await self.set_round(round_name)
-        await interaction.edit_original_message(
-            content=f'Created 🧩 "{puzzle_title}" at {channel.mention}'
-        )
 
     @classmethod
     def run_from_config(cls) -> None:
         config = ConfigParser()
         config.read("config.ini")
+        if uvloop is not None:
+            # must be set before the client creates its event loop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         bot = cls(
             token=config["discord"]["token"],
             drive_root_folder=config["Google drive"]["root folder"],
+            drive_root_folder_id=config["Google drive"].get("root folder id"),
+            drive_solved_folder_id=config["Google drive"].get("solved folder id"),
             guild_id=int(config["discord"]["guild id"]),
             rounds=config["general"].getboolean("rounds", fallback=False),
             other_configs=config,
@@ -570,29 +1044,27 @@ class PuzzleBot:
             name=puzzle_title, topic=puzzle_title, category=category
         )
 
-    @classmethod
     async def find_and_remove_voice_channel(
-        cls, context: Interaction | disnake.Guild, name: str
+        self, context: Interaction | disnake.Guild, name: str
     ) -> bool:
         interaction = context if isinstance(context, Interaction) else None
         guild = context.guild if isinstance(context, Interaction) else context
         if guild is None:
             raise ValueError("Could not access message guild")
-        channel = disnake.utils.get(guild.voice_channels, name=name)
+        channel = self.voice_channels_by_name.get(name)
         if channel is not None:
-            return await cls.remove_voice_channel(channel, interaction)
+            return await self.remove_voice_channel(channel, interaction)
         return True
 
-    @classmethod
     async def remove_voice_channel(
-        cls, voice_channel: disnake.VoiceChannel, interaction: Optional[Interaction]
+        self, voice_channel: disnake.VoiceChannel, interaction: Optional[Interaction]
     ) -> bool:
         if voice_channel.members:
             if interaction is not None:
                 await interaction.send("Not removing voice channel in use 🗣️")
             return False
         else:
-            await voice_channel.delete()
+            await self.rate_limited(voice_channel.delete())
             return True
 
 